@@ -0,0 +1,95 @@
+"""Adaptive refinement of the sampling grid for parameter sweeps.
+
+This module contains functions to adaptively choose the points at which the
+outage probability curves are evaluated. Starting from a coarse grid, only
+those intervals are refined in which the curves (in log scale) deviate from a
+linear interpolation or in which the gap between the bounds changes quickly.
+
+
+Copyright (C) 2020 Karl-Ludwig Besser
+
+This program is used in the article:
+Karl-Ludwig Besser and Eduard Jorswieck, "Bounds on the Secrecy Outage
+Probability for Dependent Fading Channels", IEEE Transactions on
+Communications, vol. 69, no. 1, pp. 443-456, Jan. 2021
+
+License:
+This program is licensed under the GPLv3 license. If you in any way use this
+code for research that results in publications, please cite our original
+article listed above.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+Author: Karl-Ludwig Besser, Technische Universität Braunschweig
+"""
+
+import numpy as np
+
+def _log_curves(results, floor=1e-12):
+    curves = [np.ravel(_curve)*np.ones(1) for _curve in results.values()]
+    return np.log10(np.maximum(np.vstack(curves), floor))
+
+def _interval_scores(x, results, tol, gap=("lower", "upper"), gap_tol=.5,
+                     floor=1e-12):
+    """Score every interval of the grid `x`.
+
+    The score of an interval is the largest deviation of its end points from
+    the linear interpolation of their neighbours (in log scale) relative to
+    `tol`, or the change of the log-gap between the bounds `gap` over the
+    interval relative to `gap_tol`. Intervals with a score larger than one
+    need to be refined.
+    """
+    logy = _log_curves(results, floor)
+    scores = np.zeros(len(x)-1)
+    if len(x) > 2:
+        _w = (x[1:-1]-x[:-2])/(x[2:]-x[:-2])
+        _interp = (1-_w)*logy[:, :-2] + _w*logy[:, 2:]
+        _dev = np.max(np.abs(logy[:, 1:-1] - _interp), axis=0)/tol
+        scores[:-1] = np.maximum(scores[:-1], _dev)
+        scores[1:] = np.maximum(scores[1:], _dev)
+    if gap is not None and all(_key in results for _key in gap):
+        _gap = np.log10(np.maximum(results[gap[1]], floor)/np.maximum(results[gap[0]], floor))
+        _gap = np.ravel(_gap)*np.ones(len(x))
+        scores = np.maximum(scores, np.abs(np.diff(_gap))/gap_tol)
+    return scores
+
+def adaptive_grid(func, x_min, x_max, num_init=9, max_points=50, tol=.05,
+                  gap=("lower", "upper"), gap_tol=.5, min_step=1e-3,
+                  floor=1e-12):
+    """Evaluate `func` on an adaptively refined grid on [x_min, x_max].
+
+    The function `func` maps an array of grid points to a dict of curves with
+    the same length, e.g., `{"lower": ..., "upper": ..., "indep": ...}`. It is
+    only called with the new points of each refinement step, such that every
+    point is evaluated exactly once.
+
+    Intervals are bisected until the curves are linear in log scale up to
+    `tol` (in decades), the log-gap between the curves named in `gap` changes
+    by less than `gap_tol` per interval, the intervals become shorter than
+    `min_step`, or the total number of points reaches `max_points`.
+
+    Returns the sorted grid points and the dict of corresponding curves.
+    """
+    x = np.linspace(x_min, x_max, min(num_init, max_points))
+    results = {_key: np.ravel(_curve)*np.ones(len(x))
+               for _key, _curve in func(x).items()}
+    while len(x) < max_points:
+        scores = _interval_scores(x, results, tol, gap=gap, gap_tol=gap_tol,
+                                  floor=floor)
+        scores[np.diff(x) < 2*min_step] = 0
+        _refine = np.flatnonzero(scores > 1)
+        if len(_refine) == 0:
+            break
+        _refine = _refine[np.argsort(scores[_refine])[::-1]]
+        _refine = np.sort(_refine[:max_points-len(x)])
+        x_new = (x[_refine] + x[_refine+1])/2.
+        results_new = func(x_new)
+        x = np.concatenate((x, x_new))
+        _order = np.argsort(x)
+        x = x[_order]
+        results = {_key: np.concatenate((_curve, np.ravel(results_new[_key])*np.ones(len(x_new))))[_order]
+                   for _key, _curve in results.items()}
+    return x, results
@@ -29,6 +29,8 @@ Author: Karl-Ludwig Besser, Technische Universität Braunschweig
 import numpy as np
 import matplotlib.pyplot as plt
 
+from adaptive_grid import adaptive_grid
+
 def _yopt_lower(r_s, lam_x, lam_y):
     yopt = np.minimum((lam_x*(2**r_s-1)+np.log(lam_y/lam_x))/(lam_x-lam_y), 0)
     if np.isscalar(yopt):
@@ -67,7 +69,9 @@ def export_results(results, filename):
     data = pd.DataFrame.from_dict(results)
     data.to_csv(filename, sep="\t", index=False)
 
-def main(r_s, r_c, lam_x, lam_y, snr_eve_db, variable="snr"):
+def main(r_s, r_c, lam_x, lam_y, snr_eve_db, variable="snr", adaptive=0):
+    if adaptive and variable != "snr":
+        raise ValueError("The adaptive grid is only supported for variable 'snr'")
     if variable == "snr":
         snr_db = np.arange(-5, 16, .5)
         xvar = snr_db
@@ -82,14 +86,21 @@ def main(r_s, r_c, lam_x, lam_y, snr_eve_db, variable="snr"):
         snr_eve_db = np.arange(-30, 21, .5)
         xvar = snr_eve_db
         filename = f"secrecy_outage_main_csit-bob_{snr_db:.1f}-rs_{r_s}-lx_{lam_x}-ly_{lam_y}.dat"
-    snr_bob = 10**(snr_db/10)
-    snr_eve = 10**(snr_eve_db/10)
-    lam_xt = lam_x/snr_bob
-    lam_yt = lam_y/(snr_eve*2**r_s)
-    print(lam_xt>lam_yt)
-    lower = lower_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
-    upper = upper_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
-    indep = independent_main_csit(r_s, r_c, lam_xt, lam_yt)
+    def _evaluate(snr_db):
+        snr_bob = 10**(snr_db/10)
+        snr_eve = 10**(snr_eve_db/10)
+        lam_xt = lam_x/snr_bob
+        lam_yt = lam_y/(snr_eve*2**r_s)
+        lower = lower_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
+        upper = upper_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
+        indep = independent_main_csit(r_s, r_c, lam_xt, lam_yt)
+        return {"upper": upper, "lower": lower, "indep": indep}
+    if adaptive:
+        xvar, results = adaptive_grid(_evaluate, np.min(snr_db),
+                                      np.max(snr_db), max_points=adaptive)
+    else:
+        results = _evaluate(snr_db)
+    lower, upper, indep = results["lower"], results["upper"], results["indep"]
     results = {variable: xvar, "upper": upper, "lower": lower, "indep": indep}
     export_results(results, filename=filename)
     plt.semilogy(xvar, lower)
@@ -151,5 +162,6 @@ if __name__ == "__main__":
     parser.add_argument("-y", dest="lam_y", default=1, type=float)
     parser.add_argument("-e", dest="snr_eve_db", type=float, default=0)
     parser.add_argument("--variable", default="snr", type=str)
+    parser.add_argument("--adaptive", default=0, type=int)
     params = vars(parser.parse_args())
     main(**params)
@@ -0,0 +1,191 @@
+"""Bounds on the secrecy outage probability with a dependence constraint.
+
+This module contains functions to calculate the best and worst secrecy
+outage probability for dependent Rayleigh fading channels, if Spearman's rho
+between Bob's and Eve's channel is (partially) known.
+The unit square is split into n x n cells and the probabilities of the cells
+are optimized by a linear program. Spearman's rho is linear in the copula,
+such that the constraint is linear as well. Kendall's tau is not, and is
+therefore not supported.
+
+Two methods are available:
+* "checkerboard": Optimization over checkerboard copulas, i.e., the copula is
+  uniform within each cell. This is an approximation of the exact bounds from
+  the inside.
+* "relaxation": Only the probabilities of the cells are fixed, while the
+  distribution within each cell is arbitrary. This gives valid (but looser)
+  bounds for any finite n. Since a cell is either counted completely or not
+  at all, the resolution is only about 1/n, which makes it useless for
+  outage probabilities below that.
+Every copula that fulfills the constraint is also covered by the bounds
+without constraint. The results are therefore combined with the closed-form
+bounds, such that they are never looser than these.
+
+
+Copyright (C) 2020 Karl-Ludwig Besser
+
+This program is used in the article:
+Karl-Ludwig Besser and Eduard Jorswieck, "Bounds on the Secrecy Outage
+Probability for Dependent Fading Channels", IEEE Transactions on
+Communications, vol. 69, no. 1, pp. 443-456, Jan. 2021
+
+License:
+This program is licensed under the GPLv3 license. If you in any way use this
+code for research that results in publications, please cite our original
+article listed above.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+Author: Karl-Ludwig Besser, Technische Universität Braunschweig
+"""
+
+import numpy as np
+from scipy import optimize, sparse
+import matplotlib.pyplot as plt
+
+from bounds_main_csit import (lower_bound_main_csit, upper_bound_main_csit,
+                              independent_main_csit, export_results)
+from bounds_no_csit import (lower_bound_no_csit, upper_bound_no_csit,
+                            independent_no_csit)
+
+def outage_threshold(u1, r_s, r_c, lam_xt, lam_yt, csit="main"):
+    """Threshold g(u1) such that an outage occurs iff U2 < g(U1)."""
+    with np.errstate(divide="ignore"):
+        xt = -np.log1p(-u1)/lam_xt
+    threshold = np.minimum(np.exp(lam_yt*(2**r_s-1-xt)), 1.)
+    if csit == "no":
+        threshold = np.where(xt < 2**(r_s+r_c)-1, 1., threshold)
+    return threshold
+
+def cell_outage(r_s, r_c, lam_xt, lam_yt, num_cells, csit="main",
+                method="relaxation", num_subpoints=32):
+    """Outage probability of every cell for the different methods.
+
+    Returns the outage coefficients of the cells for the lower and the upper
+    bound, each with shape (num_cells, num_cells).
+    """
+    edges = np.linspace(0, 1, num_cells+1)
+    if method == "checkerboard":
+        _sub = (np.arange(num_subpoints)+.5)/num_subpoints
+        _u1 = (edges[:-1, None] + _sub/num_cells)
+        _g = outage_threshold(_u1, r_s, r_c, lam_xt, lam_yt, csit=csit)
+        _frac = np.clip(num_cells*_g[:, None, :] - np.arange(num_cells)[None, :, None], 0, 1)
+        coeff = np.mean(_frac, axis=2)
+        return coeff, coeff
+    elif method == "relaxation":
+        _g_left = outage_threshold(edges[:-1], r_s, r_c, lam_xt, lam_yt, csit=csit)
+        _g_right = outage_threshold(edges[1:], r_s, r_c, lam_xt, lam_yt, csit=csit)
+        coeff_lower = (edges[None, 1:] <= _g_right[:, None]).astype(float)
+        coeff_upper = (edges[None, :-1] < _g_left[:, None]).astype(float)
+        return coeff_lower, coeff_upper
+    raise ValueError(f"Unknown method: {method}")
+
+def _constraints(num_cells, rho, method="relaxation"):
+    _ones = np.ones((1, num_cells))
+    _eye = sparse.identity(num_cells)
+    A_eq = sparse.vstack([sparse.kron(_eye, _ones), sparse.kron(_ones, _eye)])
+    b_eq = np.ones(2*num_cells)/num_cells
+    rho_min, rho_max = np.broadcast_to(rho, (2,))
+    edges = np.linspace(0, 1, num_cells+1)
+    if method == "checkerboard":
+        _mid = (edges[:-1] + edges[1:])/2.
+        _moment_low = _moment_high = np.outer(_mid, _mid).ravel()
+    else:
+        _moment_low = np.outer(edges[:-1], edges[:-1]).ravel()
+        _moment_high = np.outer(edges[1:], edges[1:]).ravel()
+    # rho = 12*E[U1*U2] - 3
+    A_ub = np.vstack([_moment_low, -_moment_high])
+    b_ub = np.array([(rho_max+3)/12, -(rho_min+3)/12])
+    return {"A_eq": A_eq, "b_eq": b_eq, "A_ub": A_ub, "b_ub": b_ub}
+
+def constrained_bounds(r_s, r_c, lam_xt, lam_yt, rho, csit="main",
+                       num_cells=40, method="relaxation"):
+    """Lower and upper bound on the outage probability for a given rho.
+
+    `rho` is either the value of Spearman's rho or a tuple (min, max) of an
+    interval that contains it. The bounds are calculated for every value of
+    `lam_xt`. The constraints of the linear program are the same for all of
+    them and are only set up once. Identical linear programs, which occur
+    for the relaxation, are only solved once.
+    The results are combined with the closed-form bounds without constraint.
+    """
+    constraints = _constraints(num_cells, rho, method=method)
+    solutions = {}
+    def _solve(coeff):
+        _key = coeff.tobytes()
+        if _key not in solutions:
+            _res = optimize.linprog(coeff.ravel(), bounds=(0, None),
+                                    method="highs", **constraints)
+            if not _res.success:
+                raise ValueError(f"No copula with rho={rho} and {num_cells} cells: {_res.message}")
+            solutions[_key] = _res.fun
+        return solutions[_key]
+    lower = []
+    upper = []
+    for _lam_xt in np.ravel(lam_xt):
+        coeff_lower, coeff_upper = cell_outage(r_s, r_c, _lam_xt, lam_yt,
+                                               num_cells, csit=csit,
+                                               method=method)
+        lower.append(_solve(coeff_lower))
+        upper.append(-_solve(-coeff_upper))
+    if csit == "main":
+        lower_closed = lower_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
+        upper_closed = upper_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
+    else:
+        lower_closed = lower_bound_no_csit(r_s, r_c, lam_xt, lam_yt)
+        upper_closed = upper_bound_no_csit(r_s, r_c, lam_xt, lam_yt)
+    lower = np.maximum(np.clip(lower, 0, 1), np.ravel(lower_closed))
+    upper = np.minimum(np.clip(upper, 0, 1), np.ravel(upper_closed))
+    return lower, upper
+
+def main(r_s, r_c, lam_x, lam_y, snr_eve_db, rho, csit="main", num_cells=40,
+         method="relaxation"):
+    snr_db = np.arange(-5, 16, .5)
+    snr_bob = 10**(snr_db/10)
+    snr_eve = 10**(snr_eve_db/10)
+    lam_xt = lam_x/snr_bob
+    lam_yt = lam_y/(snr_eve*2**r_s)
+    if csit == "main":
+        lower = lower_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
+        upper = upper_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
+        indep = independent_main_csit(r_s, r_c, lam_xt, lam_yt)
+    else:
+        lower = lower_bound_no_csit(r_s, r_c, lam_xt, lam_yt)
+        upper = upper_bound_no_csit(r_s, r_c, lam_xt, lam_yt)
+        indep = independent_no_csit(r_s, r_c, lam_xt, lam_yt)
+    lower_rho, upper_rho = constrained_bounds(r_s, r_c, lam_xt, lam_yt, rho,
+                                              csit=csit, num_cells=num_cells,
+                                              method=method)
+    plt.semilogy(snr_db, lower, label="Lower Bound")
+    plt.semilogy(snr_db, upper, label="Upper Bound")
+    plt.semilogy(snr_db, indep, label="Independent")
+    plt.semilogy(snr_db, lower_rho, '--', label="Lower Bound (rho)")
+    plt.semilogy(snr_db, upper_rho, '--', label="Upper Bound (rho)")
+    plt.xlabel("SNR Bob [dB]")
+    plt.ylabel("Secrecy Outage Probability")
+    plt.legend()
+    results = {"snr": snr_db, "upper": upper, "lower": lower, "indep": indep,
+               "upperRho": upper_rho, "lowerRho": lower_rho}
+    _rho = "_".join(str(_r) for _r in np.unique(rho))
+    filename = f"secrecy_outage_{csit}_csit-eve_{snr_eve_db:.1f}-rs_{r_s}-rc_{r_c}-lx_{lam_x}-ly_{lam_y}-rho_{_rho}-{method}.dat"
+    export_results(results, filename=filename)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", dest="r_s", default=0.1, type=float)
+    parser.add_argument("-c", dest="r_c", default=0.5, type=float)
+    parser.add_argument("-x", dest="lam_x", default=1, type=float)
+    parser.add_argument("-y", dest="lam_y", default=1, type=float)
+    parser.add_argument("-e", dest="snr_eve_db", type=float, default=0)
+    parser.add_argument("-r", dest="rho", type=float, nargs="+", default=[0.])
+    parser.add_argument("--csit", default="main", choices=["main", "no"])
+    parser.add_argument("--num-cells", type=int, default=40)
+    parser.add_argument("--method", default="relaxation",
+                        choices=["relaxation", "checkerboard"])
+    params = vars(parser.parse_args())
+    main(**params)
+    plt.show()
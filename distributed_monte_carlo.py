@@ -0,0 +1,404 @@
+"""Distributed Monte Carlo simulations of the secrecy outage probability.
+
+This module contains a coordinator and workers to distribute the Monte Carlo
+simulations from `monte_carlo_simulations_main_csit` and
+`monte_carlo_simulations_no_csit` over multiple machines.
+The simulations are split into shards of (scenario, SNR point, range of
+sample blocks). Every block has its own seed, which only depends on the base
+seed, the scenario, the SNR point, and the block index. The coordinator
+hands out the shards over TCP and sums up the returned numbers of outages
+and samples. The results are therefore the same, no matter how the shards
+were distributed.
+Workers send heartbeats while processing a shard. Shards of workers that
+disconnect or stay silent for too long are reassigned, and workers reconnect
+after a dropped connection to deliver their last result. The partial
+results can be stored in a checkpoint file, from which an interrupted
+simulation with the same configuration is resumed.
+There is no authentication of the workers. The coordinator therefore only
+listens on localhost by default, and other machines need to be allowed
+explicitly, e.g., with `--host 0.0.0.0` in a trusted network. Results whose
+numbers of samples do not match their shard are rejected.
+
+Example:
+    python3 distributed_monte_carlo.py coordinator -n 100000000 --host 0.0.0.0 --port 5000
+    python3 distributed_monte_carlo.py worker --host <coordinator> --port 5000
+
+
+Copyright (C) 2020 Karl-Ludwig Besser
+
+This program is used in the article:
+Karl-Ludwig Besser and Eduard Jorswieck, "Bounds on the Secrecy Outage
+Probability for Dependent Fading Channels", IEEE Transactions on
+Communications, vol. 69, no. 1, pp. 443-456, Jan. 2021
+
+License:
+This program is licensed under the GPLv3 license. If you in any way use this
+code for research that results in publications, please cite our original
+article listed above.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+Author: Karl-Ludwig Besser, Technische Universität Braunschweig
+"""
+
+import os
+import json
+import time
+import socket
+import inspect
+import importlib
+import threading
+import socketserver
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+from bounds_main_csit import export_results
+
+MODULES = {"main": "monte_carlo_simulations_main_csit",
+           "no": "monte_carlo_simulations_no_csit"}
+
+SCENARIOS = {"lowerMC": "monte_carlo_lower_bound",
+             "upperMC": "monte_carlo_upper_bound",
+             "indepMC": "monte_carlo_indep"}
+
+def make_shards(config, blocks_per_shard=10):
+    num_blocks = int(np.ceil(config["num_samples"]/config["block_size"]))
+    shards = {}
+    for _scen_idx in range(len(config["scenarios"])):
+        for _snr_idx, _snr_bob in enumerate(config["snr_bob"]):
+            for _start in range(0, num_blocks, blocks_per_shard):
+                _stop = min(_start+blocks_per_shard, num_blocks)
+                _id = f"{_scen_idx}:{_snr_idx}:{_start}"
+                _samples = (min(_stop*config["block_size"], config["num_samples"])
+                            - _start*config["block_size"])
+                shards[_id] = {"id": _id, "scenario": _scen_idx,
+                               "snr_idx": _snr_idx, "snr_bob": _snr_bob,
+                               "blocks": [_start, _stop], "samples": _samples}
+    return shards
+
+def count_outages(config, shard):
+    """Count the outages in the sample blocks of `shard`.
+
+    Returns the number of outages and the number of samples.
+    """
+    module_name, func_name = config["scenarios"][shard["scenario"]]
+    if module_name not in MODULES.values() or func_name not in SCENARIOS.values():
+        raise ValueError(f"Unknown scenario: {module_name}.{func_name}")
+    module = importlib.import_module(module_name)
+    sampler = inspect.unwrap(getattr(module, func_name))
+    r_s = config["r_s"]
+    if "r_c" in inspect.signature(sampler).parameters:
+        rates = (r_s, config["r_c"])
+    else:
+        rates = (r_s,)
+    snr_bob = shard["snr_bob"]
+    snr_eve = config["snr_eve"]
+    lam_xt = config["lam_x"]/snr_bob
+    lam_yt = config["lam_y"]/(snr_eve*2**r_s)
+    outages = 0
+    samples = 0
+    for _block in range(*shard["blocks"]):
+        _num = min(config["block_size"],
+                   config["num_samples"] - _block*config["block_size"])
+        np.random.seed([config["seed"], shard["scenario"], shard["snr_idx"], _block])
+        u1, u2 = sampler(*rates, lam_xt, lam_yt, _num)
+        outage = module.outage_event(u1, u2, *rates, lam_xt, lam_yt, snr_bob,
+                                     snr_eve)
+        outages += int(np.count_nonzero(outage))
+        samples += _num
+    return outages, samples
+
+def estimates(config, results):
+    """Outage probabilities estimated from the (partial) `results`."""
+    shape = (len(config["scenarios"]), len(config["snr_bob"]))
+    outages = np.zeros(shape, dtype=np.int64)
+    samples = np.zeros(shape, dtype=np.int64)
+    for _id, (_outages, _samples) in results.items():
+        _scen_idx, _snr_idx, _ = map(int, _id.split(":"))
+        outages[_scen_idx, _snr_idx] += _outages
+        samples[_scen_idx, _snr_idx] += _samples
+    with np.errstate(invalid="ignore"):
+        return outages/samples, samples
+
+
+class ShardHandler(socketserver.StreamRequestHandler):
+    def _send(self, message):
+        self.wfile.write((json.dumps(message)+"\n").encode())
+
+    def handle(self):
+        server = self.server
+        shard_id = None
+        # A worker that did not send any message (including heartbeats) for
+        # `worker_timeout` seconds is considered dead.
+        self.request.settimeout(server.worker_timeout)
+        try:
+            for line in self.rfile:
+                message = json.loads(line)
+                if message["type"] == "heartbeat":
+                    continue
+                elif message["type"] == "result":
+                    try:
+                        server.add_result(message["id"], message["outages"],
+                                          message["samples"])
+                    except ValueError as error:
+                        # The connection is closed and the shard reassigned
+                        print(f"Rejected result from {self.client_address}: {error}")
+                        raise
+                    shard_id = None
+                elif message["type"] == "error":
+                    server.fail(message["id"], message["message"])
+                    shard_id = None
+                if server.done.is_set():
+                    self._send({"type": "done"})
+                    break
+                shard_id = server.next_shard()
+                if shard_id is None:
+                    self._send({"type": "wait"})
+                else:
+                    self._send({"type": "shard", "config": server.config,
+                                "shard": server.shards[shard_id]})
+        except (OSError, ValueError, KeyError):
+            pass
+        finally:
+            if shard_id is not None:
+                server.requeue(shard_id)
+
+
+class Coordinator(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, config, blocks_per_shard=10, checkpoint=None,
+                 worker_timeout=60.):
+        super().__init__(address, ShardHandler)
+        self.config = json.loads(json.dumps(config))
+        self.blocks_per_shard = blocks_per_shard
+        self.shards = make_shards(self.config, blocks_per_shard)
+        self.checkpoint = checkpoint
+        self.worker_timeout = worker_timeout
+        self.results = {}
+        self.failure = None
+        if checkpoint is not None and os.path.isfile(checkpoint):
+            with open(checkpoint) as checkpoint_file:
+                _saved = json.load(checkpoint_file)
+            if (_saved["config"] != self.config or
+                    _saved["blocks_per_shard"] != blocks_per_shard):
+                raise ValueError(f"The checkpoint {checkpoint} belongs to a "
+                                 "different configuration")
+            self.results = {_id: _result for _id, _result in _saved["results"].items()
+                            if _id in self.shards}
+        self.pending = deque(_id for _id in self.shards if _id not in self.results)
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        if not self.pending:
+            self.done.set()
+
+    def next_shard(self):
+        with self.lock:
+            while self.pending:
+                _id = self.pending.popleft()
+                if _id not in self.results:
+                    return _id
+
+    def requeue(self, shard_id):
+        with self.lock:
+            if shard_id not in self.results and shard_id not in self.pending:
+                self.pending.appendleft(shard_id)
+
+    def add_result(self, shard_id, outages, samples):
+        # The workers are not authenticated, so at least the numbers are
+        # checked before they are merged into the estimates.
+        if shard_id in self.shards:
+            _expected = self.shards[shard_id]["samples"]
+            if (type(samples) is not int or type(outages) is not int or
+                    samples != _expected or not 0 <= outages <= samples):
+                raise ValueError(f"Invalid result for shard {shard_id}: {outages} "
+                                 f"outages in {samples} samples ({_expected} expected)")
+        with self.lock:
+            if shard_id not in self.shards or shard_id in self.results:
+                return
+            self.results[shard_id] = [outages, samples]
+            if self.checkpoint is not None:
+                self.save_checkpoint()
+            print("Finished {}/{} shards".format(len(self.results), len(self.shards)))
+            if len(self.results) == len(self.shards):
+                self.done.set()
+
+    def save_checkpoint(self):
+        # The checkpoint is replaced atomically, such that it is never left
+        # truncated if the coordinator is killed while writing it.
+        _tmp = f"{self.checkpoint}.tmp"
+        with open(_tmp, "w") as checkpoint_file:
+            json.dump({"config": self.config,
+                       "blocks_per_shard": self.blocks_per_shard,
+                       "results": self.results}, checkpoint_file)
+        os.replace(_tmp, self.checkpoint)
+
+    def fail(self, shard_id, message):
+        with self.lock:
+            self.failure = f"Shard {shard_id} failed: {message}"
+            self.done.set()
+
+
+def _send_message(stream, message):
+    stream.write((json.dumps(message)+"\n").encode())
+    stream.flush()
+
+def _process_shard(stream, config, shard, heartbeat_interval=5.):
+    """Count the outages of `shard` and send heartbeats in the meantime.
+
+    Returns the message with the result (or the error) for the coordinator.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(count_outages, config, shard)
+        while True:
+            try:
+                outages, samples = future.result(timeout=heartbeat_interval)
+            except FutureTimeoutError:
+                try:
+                    _send_message(stream, {"type": "heartbeat", "id": shard["id"]})
+                except OSError:
+                    # The result is delivered after reconnecting
+                    pass
+                continue
+            except Exception as error:
+                return {"type": "error", "id": shard["id"], "message": repr(error)}
+            return {"type": "result", "id": shard["id"], "outages": outages,
+                    "samples": samples}
+
+def _connect(host, port, retries=30):
+    for _ in range(retries):
+        try:
+            return socket.create_connection((host, port))
+        except OSError:
+            time.sleep(1)
+
+def run_worker(host="localhost", port=5000, retries=30, heartbeat_interval=5.):
+    """Process shards from the coordinator at `host:port` until it is done.
+
+    If the connection drops, the worker reconnects and first delivers the
+    result of its last shard. It stops when the coordinator is not reachable
+    for `retries` seconds.
+    """
+    message = {"type": "ready"}
+    while True:
+        connection = _connect(host, port, retries=retries)
+        if connection is None:
+            print(f"Could not connect to {host}:{port}")
+            return
+        with connection, connection.makefile("rwb") as stream:
+            try:
+                while True:
+                    _send_message(stream, message)
+                    line = stream.readline()
+                    if not line:
+                        break
+                    reply = json.loads(line)
+                    if reply["type"] == "done":
+                        return
+                    elif reply["type"] == "wait":
+                        time.sleep(1)
+                        message = {"type": "ready"}
+                    elif reply["type"] == "shard":
+                        message = _process_shard(stream, reply["config"],
+                                                 reply["shard"],
+                                                 heartbeat_interval=heartbeat_interval)
+            except OSError:
+                pass
+
+def run_coordinator(config, host="localhost", port=5000, blocks_per_shard=10,
+                    checkpoint=None, worker_timeout=60., local_workers=0):
+    """Distribute the simulations in `config` and wait for all results.
+
+    With `local_workers`, the given number of worker processes is started on
+    this machine. If all of them exit before the simulations are finished, or
+    if a worker reports an error, a `RuntimeError` is raised.
+    Returns the estimated outage probabilities with shape
+    (number of scenarios, number of SNR points).
+    """
+    with Coordinator((host, port), config, blocks_per_shard=blocks_per_shard,
+                     checkpoint=checkpoint, worker_timeout=worker_timeout) as server:
+        _port = server.server_address[1]
+        _heartbeat = min(5., worker_timeout/4.)
+        workers = [multiprocessing.Process(target=run_worker, args=("localhost", _port),
+                                           kwargs={"heartbeat_interval": _heartbeat})
+                   for _ in range(local_workers)]
+        for _worker in workers:
+            _worker.start()
+        _thread = threading.Thread(target=server.serve_forever, daemon=True)
+        _thread.start()
+        try:
+            while not server.done.wait(1):
+                if workers and not any(_worker.is_alive() for _worker in workers):
+                    raise RuntimeError("All local workers exited before the "
+                                       "simulations were finished")
+            if server.failure is not None:
+                raise RuntimeError(server.failure)
+        finally:
+            server.shutdown()
+            for _worker in workers:
+                _worker.join(timeout=10)
+                if _worker.is_alive():
+                    _worker.terminate()
+        outages, _ = estimates(server.config, server.results)
+    return outages
+
+def main(r_s, r_c, lam_x, lam_y, snr_eve_db, num_samples, csit="main",
+         block_size=10**6, blocks_per_shard=10, seed=0, host="localhost",
+         port=5000, checkpoint=None, worker_timeout=60., local_workers=0):
+    snr_db = np.arange(-5, 16, .5)
+    snr_bob = 10**(snr_db/10)
+    snr_eve = 10**(snr_eve_db/10)
+    config = {"scenarios": [[MODULES[csit], _func] for _func in SCENARIOS.values()],
+              "r_s": r_s, "r_c": r_c, "lam_x": lam_x, "lam_y": lam_y,
+              "snr_bob": list(snr_bob), "snr_eve": snr_eve,
+              "num_samples": num_samples, "block_size": block_size,
+              "seed": seed}
+    outages = run_coordinator(config, host=host, port=port,
+                              blocks_per_shard=blocks_per_shard,
+                              checkpoint=checkpoint, worker_timeout=worker_timeout,
+                              local_workers=local_workers)
+    results = {"snr": snr_db}
+    results.update(zip(SCENARIOS.keys(), outages))
+    filename = f"secrecy_outage_{csit}_csit-eve_{snr_eve_db:.1f}-rs_{r_s}-lx_{lam_x}-ly_{lam_y}-MC-distributed.dat"
+    export_results(results, filename=filename)
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    parser_coord = subparsers.add_parser("coordinator")
+    parser_coord.add_argument("-s", dest="r_s", default=0.1, type=float)
+    parser_coord.add_argument("-c", dest="r_c", default=0.5, type=float)
+    parser_coord.add_argument("-x", dest="lam_x", default=1, type=float)
+    parser_coord.add_argument("-y", dest="lam_y", default=1, type=float)
+    parser_coord.add_argument("-e", dest="snr_eve_db", type=float, default=0)
+    parser_coord.add_argument("-n", dest="num_samples", type=int, default=10000)
+    parser_coord.add_argument("--csit", default="main", choices=list(MODULES))
+    parser_coord.add_argument("--block-size", type=int, default=10**6)
+    parser_coord.add_argument("--blocks-per-shard", type=int, default=10)
+    parser_coord.add_argument("--seed", type=int, default=0)
+    parser_coord.add_argument("--host", default="localhost")
+    parser_coord.add_argument("--port", type=int, default=5000)
+    parser_coord.add_argument("--checkpoint", default=None)
+    parser_coord.add_argument("--worker-timeout", type=float, default=60.)
+    parser_coord.add_argument("--local-workers", type=int, default=0)
+    parser_worker = subparsers.add_parser("worker")
+    parser_worker.add_argument("--host", default="localhost")
+    parser_worker.add_argument("--port", type=int, default=5000)
+    parser_worker.add_argument("--heartbeat", dest="heartbeat_interval",
+                               type=float, default=5.)
+    params = vars(parser.parse_args())
+    mode = params.pop("mode")
+    if mode == "coordinator":
+        main(**params)
+    else:
+        run_worker(**params)
@@ -29,6 +29,8 @@ Author: Karl-Ludwig Besser, Technische Universität Braunschweig
 import numpy as np
 import matplotlib.pyplot as plt
 
+from adaptive_grid import adaptive_grid
+
 def g1(x, r_s, r_c, lam_x, lam_y):
     return np.minimum(np.exp(lam_y*(2**r_s-1-x)), 1) - np.exp(-lam_x*x)
 
@@ -65,15 +67,22 @@ def export_results(results, **kwargs):
     data = pd.DataFrame.from_dict(results)
     data.to_csv(filename, sep="\t", index=False)
 
-def main(r_s, r_c, lam_x, lam_y, snr_eve_db, export=False):
-    snr_db = np.linspace(-5, 15)  #np.arange(-5, 16)
-    snr_bob = 10**(snr_db/10)
-    snr_eve = 10**(snr_eve_db/10)
-    lam_xt = lam_x/snr_bob
-    lam_yt = lam_y/(snr_eve*2**r_s)
-    lower = lower_bound_main_csit_full(r_s, r_c, lam_xt, lam_yt)
-    upper = upper_bound_main_csit_full(r_s, r_c, lam_xt, lam_yt)
-    indep = independent_main_csit_full(r_s, r_c, lam_xt, lam_yt)
+def main(r_s, r_c, lam_x, lam_y, snr_eve_db, export=False, adaptive=0):
+    def _evaluate(snr_db):
+        snr_bob = 10**(snr_db/10)
+        snr_eve = 10**(snr_eve_db/10)
+        lam_xt = lam_x/snr_bob
+        lam_yt = lam_y/(snr_eve*2**r_s)
+        lower = lower_bound_main_csit_full(r_s, r_c, lam_xt, lam_yt)
+        upper = upper_bound_main_csit_full(r_s, r_c, lam_xt, lam_yt)
+        indep = independent_main_csit_full(r_s, r_c, lam_xt, lam_yt)
+        return {"upper": upper, "lower": lower, "indep": indep}
+    if adaptive:
+        snr_db, results = adaptive_grid(_evaluate, -5, 15, max_points=adaptive)
+    else:
+        snr_db = np.linspace(-5, 15)  #np.arange(-5, 16)
+        results = _evaluate(snr_db)
+    lower, upper, indep = results["lower"], results["upper"], results["indep"]
     if export:
         results = {"snr": snr_db, "upper": upper, "lower": lower, "indep": indep}
         export_results(results, snr_eve_db=snr_eve_db, lam_x=lam_x, lam_y=lam_y,
@@ -93,5 +102,6 @@ if __name__ == "__main__":
     parser.add_argument("-y", dest="lam_y", default=1, type=float)
     parser.add_argument("-e", dest="snr_eve_db", type=float, default=0)
     parser.add_argument("--export", action="store_true")
+    parser.add_argument("--adaptive", default=0, type=int)
     params = vars(parser.parse_args())
     main(**params)
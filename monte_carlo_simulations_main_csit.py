@@ -32,6 +32,8 @@ import numpy as np
 from scipy import stats
 import matplotlib.pyplot as plt
 
+from adaptive_grid import adaptive_grid
+from outage_quadrature import singular_outage, density_outage
 from bounds_main_csit import (lower_bound_main_csit, upper_bound_main_csit,
                               independent_main_csit, export_results)
 
@@ -43,16 +45,171 @@ def monte_carlo(func):
         for _snr_bob in snr_bob:
             lam_xt = lam_x/_snr_bob
             u1, u2 = func(r_s, lam_xt, lam_yt, num_samples)
-            yt = inv_cdf_yt(u2, lam=lam_yt)
-            xt = inv_cdf_xt(u1, lam=lam_xt)
-            x = xt/_snr_bob
-            y = -yt/(2**r_s*snr_eve)
-            cs = secrecy_capacity(x, y, _snr_bob, snr_eve)
-            _eps = np.count_nonzero(cs < r_s)/len(cs)
+            outage = outage_event(u1, u2, r_s, lam_xt, lam_yt, _snr_bob, snr_eve)
+            _eps = np.count_nonzero(outage)/len(outage)
             outages.append(_eps)
         return outages
     return wrapper_monte_carlo
 
+def monte_carlo_control_variate(func):
+    """Monte Carlo estimation with the independent case as control variate.
+
+    For every sample `u1` of the copula `func`, the conditional outage
+    probability min(g(u1), 1) for an independent U2 is used as control
+    variate. Its mean is the closed-form `independent_main_csit`, and it does
+    not require any additional random samples. Since an outage occurs iff
+    U2 < g(U1), the same values also determine the outage events.
+    The coefficient is estimated from the samples at each SNR point.
+    Returns the estimated outage probabilities and the achieved variance
+    reduction factors. The factors compare the variances for the same number
+    of samples, i.e., the (small) additional cost of evaluating the control is
+    not taken into account.
+    """
+    @functools.wraps(func)
+    def wrapper_control_variate(r_s, lam_x, lam_y, snr_bob, snr_eve, num_samples):
+        outages = []
+        reductions = []
+        lam_yt = lam_y/(snr_eve*2**r_s)
+        for _snr_bob in snr_bob:
+            lam_xt = lam_x/_snr_bob
+            u1, u2 = func(r_s, lam_xt, lam_yt, num_samples)
+            xt = inv_cdf_xt(u1, lam=lam_xt)
+            control = np.minimum(np.exp(lam_yt*(2**r_s-1-xt)), 1)
+            outage = u2 < control
+            _mean_control = independent_main_csit(r_s, 1, lam_xt, lam_yt)
+            _eps, _reduction = control_variate_estimate(outage, [control],
+                                                        [_mean_control])
+            outages.append(_eps)
+            reductions.append(_reduction)
+        return outages, reductions
+    return wrapper_control_variate
+
+def _outage_region(r_s, lam_x, lam_y, snr_bob, snr_eve):
+    lam_xt = lam_x/np.reshape(snr_bob, (-1, 1))
+    lam_yt = lam_y/(snr_eve*2**r_s)
+    def log_threshold(u1):
+        return lam_yt*(2**r_s-1 - inv_cdf_xt(u1, lam=lam_xt))
+    # For X < 2^r_s-1, there is always an outage (threshold g >= 1)
+    u1_min = 1.-np.exp(-lam_xt*(2**r_s-1))
+    return log_threshold, u1_min, lam_xt, lam_yt
+
+def quadrature_singular(func):
+    """Semi-analytic evaluation for a singular copula.
+
+    Replacement for `monte_carlo` where `func` returns the pieces of the
+    copula (see `outage_quadrature.singular_outage`). The argument
+    `num_samples` is only kept for compatibility and is ignored.
+    Returns the outage probabilities for all `snr_bob` like `monte_carlo`.
+    With `return_error`, a tuple of the outage probabilities and estimates of
+    their absolute errors is returned instead.
+    """
+    @functools.wraps(func)
+    def wrapper_quadrature(r_s, lam_x, lam_y, snr_bob, snr_eve, num_samples=None,
+                           return_error=False):
+        log_threshold, u1_min, lam_xt, lam_yt = _outage_region(
+                r_s, lam_x, lam_y, snr_bob, snr_eve)
+        pieces = func(r_s, lam_xt, lam_yt)
+        prob, error = singular_outage(log_threshold, u1_min, pieces)
+        return (prob, error) if return_error else prob
+    return wrapper_quadrature
+
+def quadrature_density(func):
+    """Semi-analytic evaluation for a copula with density `func`.
+
+    Replacement for `monte_carlo` (see `quadrature_singular`).
+    """
+    @functools.wraps(func)
+    def wrapper_quadrature(r_s, lam_x, lam_y, snr_bob, snr_eve, num_samples=None,
+                           return_error=False):
+        log_threshold, u1_min, lam_xt, lam_yt = _outage_region(
+                r_s, lam_x, lam_y, snr_bob, snr_eve)
+        density = lambda u1, u2: func(u1, u2, r_s, lam_xt, lam_yt)
+        prob, error = density_outage(log_threshold, u1_min, density)
+        return (prob, error) if return_error else prob
+    return wrapper_quadrature
+
+def control_variate_estimate(samples, controls, means):
+    """Estimate the mean of `samples` using `controls` with known `means`.
+
+    The coefficients are chosen to minimize the variance of the estimator
+    (least squares). Returns the estimate and the variance reduction factor
+    compared to the plain sample mean.
+    """
+    samples = np.asarray(samples, dtype=float)
+    controls = np.asarray(controls, dtype=float)
+    _mean_controls = np.mean(controls, axis=1)
+    _controls_c = controls - _mean_controls[:, None]
+    # Normal equations of the least squares problem, which only require the
+    # (small) covariance matrix of the controls
+    _cov_controls = _controls_c @ _controls_c.T/len(samples)
+    _cov_samples = _controls_c @ samples/len(samples)
+    coeff = np.linalg.lstsq(_cov_controls, _cov_samples, rcond=None)[0]
+    estimate = np.mean(samples) - (_mean_controls - np.asarray(means)) @ coeff
+    var_plain = np.var(samples)
+    var_cv = var_plain - _cov_samples @ coeff
+    if var_plain == 0:
+        reduction = 1.
+    elif var_cv <= var_plain*np.sqrt(np.finfo(float).eps):
+        reduction = np.inf
+    else:
+        reduction = var_plain/var_cv
+    return estimate, reduction
+
+def outage_event(u1, u2, r_s, lam_xt, lam_yt, snr_bob, snr_eve):
+    yt = inv_cdf_yt(u2, lam=lam_yt)
+    xt = inv_cdf_xt(u1, lam=lam_xt)
+    x = xt/snr_bob
+    y = -yt/(2**r_s*snr_eve)
+    cs = secrecy_capacity(x, y, snr_bob, snr_eve)
+    return cs < r_s
+
+def monte_carlo_rates(func):
+    """Monte Carlo estimation of the outage probability for multiple rates.
+
+    The samples of the secrecy capacity are generated once per SNR point and
+    the outage probabilities for all `rates` are obtained from their
+    empirical CDF. The samples are processed in batches of `batch_size`, such
+    that the memory does not grow with `num_samples`.
+    This is only valid for copulas which do not depend on r_s, e.g., the
+    independent case. It can not be used for the threshold copulas of the
+    bounds.
+    Returns the outage probabilities with shape (len(snr_bob), len(rates)).
+    """
+    @functools.wraps(func)
+    def wrapper_monte_carlo_rates(rates, lam_x, lam_y, snr_bob, snr_eve,
+                                  num_samples, batch_size=10**6):
+        outages = []
+        lam_yt = lam_y/snr_eve
+        for _snr_bob in snr_bob:
+            lam_xt = lam_x/_snr_bob
+            counts = np.zeros(np.shape(rates), dtype=int)
+            for _start in range(0, num_samples, batch_size):
+                _num = min(batch_size, num_samples-_start)
+                u1, u2 = func(0, lam_xt, lam_yt, _num)
+                cs = np.sort(capacity_samples(u1, u2, lam_xt, lam_yt, _snr_bob, snr_eve))
+                counts += np.searchsorted(cs, rates, side="left")
+            outages.append(counts/num_samples)
+        return np.array(outages)
+    return wrapper_monte_carlo_rates
+
+def capacity_samples(u1, u2, lam_xt, lam_yt, snr_bob, snr_eve):
+    """Samples of the secrecy capacity for r_s = 0."""
+    xt = inv_cdf_xt(u1, lam=lam_xt)
+    yt = inv_cdf_yt(u2, lam=lam_yt)
+    return secrecy_capacity(xt/snr_bob, -yt/snr_eve, snr_bob, snr_eve)
+
+def eps_outage_rate(rates, outages, eps):
+    """Largest rate in `rates` with an outage probability of at most `eps`.
+
+    `outages` are the outage probabilities for the `rates` with shape
+    (..., len(rates)), e.g., from `monte_carlo_rates`. Returns zero if no rate
+    fulfills the constraint.
+    """
+    eps = np.asarray(eps)
+    outages = np.asarray(outages)
+    _feasible = outages <= np.reshape(eps, eps.shape+(1,)*outages.ndim)
+    return np.max(np.where(_feasible, rates, 0.), axis=-1)
+
 def secrecy_capacity(x, y, snr_x, snr_y):
     cap_bob = np.log2(1 + snr_x*x)
     cap_eve = np.log2(1 + snr_y*y)
@@ -74,42 +231,90 @@ def sample_copula_upper_main_csit(r_s=1, lam_xt=1, lam_yt=1, num_samples=1000):
     u2[idx_counter] = t-u1[idx_counter]
     return u1, u2
 
+def copula_pieces_lower_main_csit(r_s=1, lam_xt=1, lam_yt=1):
+    t = lower_bound_main_csit(r_s, 1, lam_xt, lam_yt)
+    return [(0, t, 0, 1), (t, 1, 1+t, -1)]
+
+def copula_pieces_upper_main_csit(r_s=1, lam_xt=1, lam_yt=1):
+    t = upper_bound_main_csit(r_s, 1, lam_xt, lam_yt)
+    return [(0, t, t, -1), (t, 1, 0, 1)]
+
 def inv_cdf_xt(u, lam=1):
     return -np.log(1-u)/lam
 
 def inv_cdf_yt(u, lam=1):
     return np.log(u)/lam
 
-def main(r_s, r_c, lam_x, lam_y, snr_eve_db, num_samples=1000):
-    snr_db = np.arange(-5, 16, .5)
+def main(r_s, r_c, lam_x, lam_y, snr_eve_db, num_samples=1000, adaptive=0,
+         control_variate=False, quadrature=False):
+    if quadrature and control_variate:
+        raise ValueError("The control variates are only used for the Monte Carlo simulations")
+    # Analytical Bounds
+    def _evaluate(snr_db):
+        snr_bob = 10**(snr_db/10)
+        snr_eve = 10**(snr_eve_db/10)
+        lam_xt = lam_x/snr_bob
+        lam_yt = lam_y/(snr_eve*2**r_s)
+        lower = lower_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
+        upper = upper_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
+        indep = independent_main_csit(r_s, r_c, lam_xt, lam_yt)
+        return {"upper": upper, "lower": lower, "indep": indep}
+    # The (cheap) analytical curves determine the grid on which the (expensive)
+    # Monte Carlo simulations are run.
+    if adaptive:
+        snr_db, results = adaptive_grid(_evaluate, -5, 15, max_points=adaptive)
+    else:
+        snr_db = np.arange(-5, 16, .5)
+        results = _evaluate(snr_db)
+    lower, upper, indep = results["lower"], results["upper"], results["indep"]
     snr_bob = 10**(snr_db/10)
     snr_eve = 10**(snr_eve_db/10)
-    lam_xt = lam_x/snr_bob
-    lam_yt = lam_y/(snr_eve*2**r_s)
-    # Analytical Bounds
-    lower = lower_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
-    upper = upper_bound_main_csit(r_s, r_c, lam_xt, lam_yt)
-    indep = independent_main_csit(r_s, r_c, lam_xt, lam_yt)
     plt.semilogy(snr_db, lower)
     plt.semilogy(snr_db, upper)
     plt.semilogy(snr_db, indep)
 
     monte_carlo_outages = {}
-    monte_carlo_outages["lowerMC"] = monte_carlo_lower_bound(r_s, lam_x, lam_y,
-                                                             snr_bob, snr_eve,
-                                                             num_samples)
-    monte_carlo_outages["upperMC"] = monte_carlo_upper_bound(r_s, lam_x, lam_y,
-                                                             snr_bob, snr_eve,
-                                                             num_samples)
-    monte_carlo_outages["indepMC"] = monte_carlo_indep(r_s, lam_x, lam_y,
-                                                       snr_bob, snr_eve,
-                                                       num_samples)
-    plt.semilogy(snr_db, monte_carlo_outages["lowerMC"], 'o', label="MC Lower")
-    plt.semilogy(snr_db, monte_carlo_outages["upperMC"], 'o', label="MC Upper")
-    plt.semilogy(snr_db, monte_carlo_outages["indepMC"], 'o', label="MC Indep")
+    if quadrature:
+        # The semi-analytic evaluation replaces the simulations
+        (monte_carlo_outages["lowerQ"],
+         monte_carlo_outages["lowerQErr"]) = quadrature_lower_bound(
+                 r_s, lam_x, lam_y, snr_bob, snr_eve, return_error=True)
+        (monte_carlo_outages["upperQ"],
+         monte_carlo_outages["upperQErr"]) = quadrature_upper_bound(
+                 r_s, lam_x, lam_y, snr_bob, snr_eve, return_error=True)
+        (monte_carlo_outages["indepQ"],
+         monte_carlo_outages["indepQErr"]) = quadrature_indep(
+                 r_s, lam_x, lam_y, snr_bob, snr_eve, return_error=True)
+        plt.semilogy(snr_db, monte_carlo_outages["lowerQ"], 'x', label="Quad Lower")
+        plt.semilogy(snr_db, monte_carlo_outages["upperQ"], 'x', label="Quad Upper")
+        plt.semilogy(snr_db, monte_carlo_outages["indepQ"], 'x', label="Quad Indep")
+    else:
+        if control_variate:
+            (monte_carlo_outages["lowerMC"],
+             monte_carlo_outages["lowerVR"]) = monte_carlo_lower_bound_cv(
+                     r_s, lam_x, lam_y, snr_bob, snr_eve, num_samples)
+            (monte_carlo_outages["upperMC"],
+             monte_carlo_outages["upperVR"]) = monte_carlo_upper_bound_cv(
+                     r_s, lam_x, lam_y, snr_bob, snr_eve, num_samples)
+            print("Variance reduction (lower): {}".format(np.array(monte_carlo_outages["lowerVR"])))
+            print("Variance reduction (upper): {}".format(np.array(monte_carlo_outages["upperVR"])))
+        else:
+            monte_carlo_outages["lowerMC"] = monte_carlo_lower_bound(r_s, lam_x, lam_y,
+                                                                     snr_bob, snr_eve,
+                                                                     num_samples)
+            monte_carlo_outages["upperMC"] = monte_carlo_upper_bound(r_s, lam_x, lam_y,
+                                                                     snr_bob, snr_eve,
+                                                                     num_samples)
+        monte_carlo_outages["indepMC"] = monte_carlo_indep(r_s, lam_x, lam_y,
+                                                           snr_bob, snr_eve,
+                                                           num_samples)
+        plt.semilogy(snr_db, monte_carlo_outages["lowerMC"], 'o', label="MC Lower")
+        plt.semilogy(snr_db, monte_carlo_outages["upperMC"], 'o', label="MC Upper")
+        plt.semilogy(snr_db, monte_carlo_outages["indepMC"], 'o', label="MC Indep")
     plt.xlabel("SNR Bob [dB]")
     plt.ylabel("Secrecy Outage Probability")
-    filename = f"secrecy_outage_main_csit-eve_{snr_eve_db:.1f}-rs_{r_s}-lx_{lam_x}-ly_{lam_y}-MC.dat"
+    _suffix = "Q" if quadrature else "MC"
+    filename = f"secrecy_outage_main_csit-eve_{snr_eve_db:.1f}-rs_{r_s}-lx_{lam_x}-ly_{lam_y}-{_suffix}.dat"
     results = {"snr": snr_db, "upper": upper, "lower": lower, "indep": indep}
     results.update(monte_carlo_outages)
     export_results(results, filename=filename)
@@ -117,6 +322,11 @@ def main(r_s, r_c, lam_x, lam_y, snr_eve_db, num_samples=1000):
 
 monte_carlo_lower_bound = monte_carlo(sample_copula_lower_main_csit)
 monte_carlo_upper_bound = monte_carlo(sample_copula_upper_main_csit)
+monte_carlo_lower_bound_cv = monte_carlo_control_variate(sample_copula_lower_main_csit)
+monte_carlo_upper_bound_cv = monte_carlo_control_variate(sample_copula_upper_main_csit)
+
+quadrature_lower_bound = quadrature_singular(copula_pieces_lower_main_csit)
+quadrature_upper_bound = quadrature_singular(copula_pieces_upper_main_csit)
 
 @monte_carlo
 def monte_carlo_indep(r_s=1, lam_xt=1, lam_yt=1, num_samples=1000):
@@ -124,6 +334,27 @@ def monte_carlo_indep(r_s=1, lam_xt=1, lam_yt=1, num_samples=1000):
     u2 = np.random.rand(num_samples)
     return u1, u2
 
+def main_rates(r_c, lam_x, lam_y, snr_db, snr_eve_db, num_samples=1000):
+    snr_bob = 10**(snr_db/10)
+    snr_eve = 10**(snr_eve_db/10)
+    rates = np.linspace(0, 10, 1001)
+    outages = monte_carlo_rates_indep(rates, lam_x, lam_y, [snr_bob], snr_eve,
+                                      num_samples)[0]
+    eps = np.logspace(-4, 0, 250, endpoint=False)
+    rate = {"eps": eps, "indepMC": eps_outage_rate(rates, outages, eps)}
+    plt.loglog(eps, rate["indepMC"], label="MC Indep")
+    plt.xlabel("Outage Probability $\\varepsilon$")
+    plt.ylabel("Secrecy Rate $R_S$")
+    plt.legend()
+    filename = f"eps_outage_sec_rates-main_csit-lx{lam_x}-ly{lam_y}-snrx{snr_db}-snry{snr_eve_db}-MC.dat"
+    export_results(rate, filename=filename)
+
+monte_carlo_rates_indep = monte_carlo_rates(monte_carlo_indep.__wrapped__)
+
+@quadrature_density
+def quadrature_indep(u1, u2, r_s=1, lam_xt=1, lam_yt=1):
+    return np.ones(np.broadcast(u1, u2).shape)
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
@@ -133,6 +364,16 @@ if __name__ == "__main__":
     parser.add_argument("-y", dest="lam_y", default=1, type=float)
     parser.add_argument("-e", dest="snr_eve_db", type=float, default=0)
     parser.add_argument("-n", dest="num_samples", type=int, default=10000)
+    parser.add_argument("--adaptive", default=0, type=int)
+    parser.add_argument("--control-variate", action="store_true")
+    parser.add_argument("--quadrature", action="store_true")
+    parser.add_argument("--rates", action="store_true")
+    parser.add_argument("-b", dest="snr_db", type=float, default=5)
     params = vars(parser.parse_args())
-    main(**params)
+    snr_db = params.pop("snr_db")
+    if params.pop("rates"):
+        main_rates(params["r_c"], params["lam_x"], params["lam_y"], snr_db,
+                   params["snr_eve_db"], params["num_samples"])
+    else:
+        main(**params)
     plt.show()
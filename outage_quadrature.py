@@ -0,0 +1,124 @@
+"""Semi-analytic evaluation of the secrecy outage probability.
+
+This module contains functions to evaluate the secrecy outage probability for
+a given copula by numerical integration instead of Monte Carlo simulations.
+The outage event is described in the copula domain as
+    U1 < u1_min  or  U2 < g(U1)
+with a non-increasing threshold function g.
+For singular copulas, where U2 is a piecewise linear function of U1, the
+outage probability is the length of a set in U1, which is determined by root
+finding. For copulas with a density, it is evaluated by (nested) adaptive
+quadrature.
+All functions are vectorized over the first axis (e.g., the SNR points).
+
+
+Copyright (C) 2020 Karl-Ludwig Besser
+
+This program is used in the article:
+Karl-Ludwig Besser and Eduard Jorswieck, "Bounds on the Secrecy Outage
+Probability for Dependent Fading Channels", IEEE Transactions on
+Communications, vol. 69, no. 1, pp. 443-456, Jan. 2021
+
+License:
+This program is licensed under the GPLv3 license. If you in any way use this
+code for research that results in publications, please cite our original
+article listed above.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+Author: Karl-Ludwig Besser, Technische Universität Braunschweig
+"""
+
+import numpy as np
+from scipy import integrate
+
+def _outage_length(log_threshold, lo, hi, offset, slope, num_points=1025,
+                   num_iter=60, refine=8):
+    """Length of the set {u1 in [lo, hi]: offset+slope*u1 < g(u1)}.
+
+    The interval is split into `num_points-1` cells. Cells in which the sign
+    of log(u2) - log(g(u1)) changes are refined by bisection.
+    The error estimate is the sum of the final bisection brackets plus the
+    width of all cells with missed crossings. For an increasing piece
+    (slope >= 0), the difference to the non-increasing g is increasing, such
+    that there is at most one crossing, which is never missed. Otherwise, the
+    crossings of every cell are counted on a grid that is `refine` times
+    finer and cells with more crossings than found on the coarse grid are
+    counted as missed.
+    """
+    u1 = lo + (hi-lo)*np.linspace(0, 1, num_points)
+    def _is_outage(u1):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            _diff = np.log(offset + slope*u1) - log_threshold(u1)
+        return _diff < 0
+    outage = _is_outage(u1)
+    left, right = u1[:, :-1], u1[:, 1:]
+    outage_left, outage_right = outage[:, :-1], outage[:, 1:]
+    length = np.sum(np.where(outage_left & outage_right, right-left, 0.), axis=1)
+    change = outage_left != outage_right
+    _left, _right = np.copy(left), np.copy(right)
+    for _ in range(num_iter):
+        _mid = (_left + _right)/2.
+        _same = _is_outage(_mid) == outage_left
+        _left = np.where(change & _same, _mid, _left)
+        _right = np.where(change & ~_same, _mid, _right)
+    root = (_left + _right)/2.
+    length += np.sum(np.where(change & outage_left, root-left, 0.), axis=1)
+    length += np.sum(np.where(change & outage_right, right-root, 0.), axis=1)
+    error = np.sum(np.where(change, _right-_left, 0.), axis=1)
+    if np.any(np.asarray(slope) < 0):
+        _fine = _is_outage(lo + (hi-lo)*np.linspace(0, 1, (num_points-1)*refine+1))
+        _crossings = np.diff(_fine, axis=1).reshape(len(_fine), num_points-1, refine)
+        _missed = np.count_nonzero(_crossings, axis=2) > change
+        error += np.sum(np.where(_missed, right-left, 0.), axis=1)
+    return length, error
+
+def singular_outage(log_threshold, u1_min, pieces, num_points=1025):
+    """Outage probability for a singular copula.
+
+    The copula is given by its `pieces`, which are tuples
+    `(lo, hi, offset, slope)` such that U2 = offset + slope*U1 for
+    lo <= U1 < hi. `log_threshold` returns log(g(u1)) for arrays of shape
+    (N, K), where N is the number of evaluated parameter sets.
+
+    Returns the outage probabilities and an estimate of their absolute error
+    (see `_outage_length`).
+    """
+    u1_min = np.reshape(u1_min, (-1, 1))
+    prob = np.ravel(u1_min)
+    error = np.zeros(len(u1_min))
+    for lo, hi, offset, slope in pieces:
+        lo = np.maximum(np.broadcast_to(lo, u1_min.shape), u1_min)
+        hi = np.maximum(np.broadcast_to(hi, u1_min.shape), u1_min)
+        _length, _error = _outage_length(log_threshold, lo, hi, offset, slope,
+                                         num_points=num_points)
+        prob = prob + _length
+        error = error + _error
+    return np.minimum(prob, 1.), error
+
+def density_outage(log_threshold, u1_min, density, epsabs=1e-13,
+                   epsrel=1e-10):
+    """Outage probability for a copula with a density.
+
+    The probability P(U1 < u1_min) + P(U1 >= u1_min, U2 < g(U1)) is evaluated
+    by nested adaptive quadrature, where `density(u1, u2)` is the copula
+    density for arrays of shape (N, 1).
+
+    Returns the outage probabilities and an estimate of their absolute error.
+    """
+    u1_min = np.reshape(u1_min, (-1, 1))
+    inner_errors = []
+    def _inner(w):
+        u1 = u1_min + (1.-u1_min)*w
+        _g = np.minimum(np.exp(log_threshold(u1)), 1.)
+        _res, _err = integrate.quad_vec(lambda v: density(u1, v*_g)*_g, 0, 1,
+                                        epsabs=epsabs, epsrel=epsrel)
+        inner_errors.append(_err)
+        return (1.-u1_min)*_res
+    prob, error = integrate.quad_vec(_inner, 0, 1, epsabs=epsabs,
+                                     epsrel=epsrel)
+    error = error + np.max(inner_errors)
+    return np.ravel(u1_min + prob), np.ravel(error)*np.ones(len(u1_min))
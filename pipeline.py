@@ -0,0 +1,229 @@
+"""Pipeline to reproduce the result files of the paper.
+
+This module contains a declarative list of all result files together with the
+function and parameters that produce them. A target is only rebuilt if one
+of its outputs is missing or if its parameters or the source code of any of
+the functions it (transitively) calls has changed. Stale targets are run in
+parallel.
+Additionally, the expensive Monte Carlo simulations of a target are cached
+individually, such that, e.g., a change in `upper_bound_no_csit` only repeats
+the simulations that actually depend on it.
+
+Example:
+    python3 pipeline.py -j 4
+
+
+Copyright (C) 2020 Karl-Ludwig Besser
+
+This program is used in the article:
+Karl-Ludwig Besser and Eduard Jorswieck, "Bounds on the Secrecy Outage
+Probability for Dependent Fading Channels", IEEE Transactions on
+Communications, vol. 69, no. 1, pp. 443-456, Jan. 2021
+
+License:
+This program is licensed under the GPLv3 license. If you in any way use this
+code for research that results in publications, please cite our original
+article listed above.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+Author: Karl-Ludwig Besser, Technische Universität Braunschweig
+"""
+
+import os
+import json
+import types
+import pickle
+import hashlib
+import inspect
+import functools
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+STAMP_FILE = ".pipeline_stamps.json"
+CACHE_DIR = ".pipeline_cache"
+
+MONTE_CARLO_FUNCTIONS = ["monte_carlo_lower_bound", "monte_carlo_upper_bound",
+                         "monte_carlo_indep"]
+
+TARGETS = {
+    "bounds_main_csit": {
+        "module": "bounds_main_csit", "function": "main",
+        "kwargs": {"r_s": .1, "r_c": .5, "lam_x": 1, "lam_y": 1,
+                   "snr_eve_db": 0.},
+        "outputs": ["secrecy_outage_main_csit-eve_0.0-rs_0.1-lx_1-ly_1.dat"],
+        },
+    "bounds_no_csit": {
+        "module": "bounds_no_csit", "function": "main",
+        "kwargs": {"r_s": .1, "r_c": 1., "lam_x": 1, "lam_y": 1,
+                   "snr_eve_db": 0.},
+        "outputs": ["secrecy_outage_no_csit-eve_0.0-rs_0.1-rc_1.0-lx_1-ly_1.dat"],
+        },
+    "full_outage_main_csit": {
+        "module": "full_outage_main_csit", "function": "main",
+        "kwargs": {"r_s": .1, "r_c": 1., "lam_x": 1, "lam_y": 1,
+                   "snr_eve_db": 0., "export": True},
+        "outputs": ["full_secrecy_outage_main_csit-eve_0.0-rs_0.1-rc_1.0-lx_1-ly_1.dat"],
+        },
+    "full_outage_no_csit": {
+        "module": "full_outage_no_csit", "function": "main",
+        "kwargs": {"r_s": .1, "r_c": 1., "lam_x": 1, "lam_y": 1,
+                   "snr_eve_db": 0., "export": True},
+        "outputs": ["full_secrecy_outage_no_csit-eve_0.0-rs_0.1-rc_1.0-lx_1-ly_1.dat"],
+        },
+    "monte_carlo_main_csit": {
+        "module": "monte_carlo_simulations_main_csit", "function": "main",
+        "kwargs": {"r_s": .1, "r_c": .5, "lam_x": 1, "lam_y": 1,
+                   "snr_eve_db": 0., "num_samples": 10000},
+        "outputs": ["secrecy_outage_main_csit-eve_0.0-rs_0.1-lx_1-ly_1-MC.dat"],
+        "cache": MONTE_CARLO_FUNCTIONS,
+        },
+    "monte_carlo_no_csit": {
+        "module": "monte_carlo_simulations_no_csit", "function": "main",
+        "kwargs": {"r_s": .1, "r_c": .5, "lam_x": 1, "lam_y": 1,
+                   "snr_eve_db": 0., "num_samples": 10000},
+        "outputs": ["secrecy_outage_no_csit-eve_0.0-rs_0.1-lx_1-ly_1-MC.dat"],
+        "cache": MONTE_CARLO_FUNCTIONS,
+        },
+    "secrecy_rate_main_csit": {
+        "module": "bounds_secrecy_rate_main_csit", "function": "main",
+        "kwargs": {"r_c": .5, "lam_x": 1, "lam_y": 1, "snr_db": 5,
+                   "snr_eve_db": 0},
+        "outputs": ["eps_outage_sec_rates-main_csit-lx1-ly1-snrx5-snry0.dat"],
+        },
+    }
+
+def _is_local(func):
+    _dir = os.path.dirname(os.path.abspath(__file__))
+    return (isinstance(func, types.FunctionType) and
+            os.path.dirname(os.path.abspath(func.__code__.co_filename)) == _dir)
+
+def _referenced_functions(func):
+    names = set()
+    codes = [func.__code__]
+    while codes:
+        _code = codes.pop()
+        names.update(_code.co_names)
+        codes.extend(_c for _c in _code.co_consts if isinstance(_c, types.CodeType))
+    referenced = [func.__globals__.get(_name) for _name in names]
+    referenced.extend(_cell.cell_contents for _cell in (func.__closure__ or ()))
+    return [_func for _func in referenced if _is_local(_func)]
+
+def source_hash(func):
+    """Hash of the source code of `func` and all local functions it calls."""
+    functions = {}
+    stack = [func]
+    while stack:
+        _func = stack.pop()
+        _key = (_func.__module__, _func.__qualname__, _func.__code__.co_firstlineno)
+        if _key in functions:
+            continue
+        functions[_key] = inspect.getsource(_func.__code__)
+        stack.extend(_referenced_functions(_func))
+    hasher = hashlib.sha256()
+    for (_module, _name, _), _source in sorted(functions.items()):
+        hasher.update(f"{_module}.{_name}\n{_source}".encode())
+    return hasher.hexdigest()
+
+def target_hash(target):
+    module = importlib.import_module(target["module"])
+    func = getattr(module, target["function"])
+    hasher = hashlib.sha256()
+    hasher.update(json.dumps(target["kwargs"], sort_keys=True).encode())
+    hasher.update(source_hash(func).encode())
+    for _name in sorted(target.get("cache", [])):
+        hasher.update(source_hash(getattr(module, _name)).encode())
+    return hasher.hexdigest()
+
+def cached(func, cache_dir=CACHE_DIR):
+    """Cache the results of `func` on disk based on its source and arguments."""
+    _source_hash = source_hash(func)
+    @functools.wraps(func)
+    def wrapper_cached(*args, **kwargs):
+        hasher = hashlib.sha256(_source_hash.encode())
+        hasher.update(pickle.dumps((args, sorted(kwargs.items()))))
+        filename = os.path.join(cache_dir, f"{func.__name__}-{hasher.hexdigest()}.pkl")
+        if os.path.isfile(filename):
+            with open(filename, "rb") as cache_file:
+                return pickle.load(cache_file)
+        result = func(*args, **kwargs)
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(filename, "wb") as cache_file:
+            pickle.dump(result, cache_file)
+        return result
+    return wrapper_cached
+
+def load_stamps():
+    if not os.path.isfile(STAMP_FILE):
+        return {}
+    with open(STAMP_FILE) as stamp_file:
+        return json.load(stamp_file)
+
+def save_stamps(stamps):
+    with open(STAMP_FILE, "w") as stamp_file:
+        json.dump(stamps, stamp_file, indent=2, sort_keys=True)
+
+def stale_targets(targets, stamps):
+    stale = {}
+    for _name, _target in targets.items():
+        _hash = target_hash(_target)
+        _missing = not all(os.path.isfile(_out) for _out in _target["outputs"])
+        if _missing or stamps.get(_name) != _hash:
+            stale[_name] = _hash
+    return stale
+
+def run_target(target):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    module = importlib.import_module(target["module"])
+    _originals = {_name: getattr(module, _name) for _name in target.get("cache", [])}
+    try:
+        for _name, _func in _originals.items():
+            setattr(module, _name, cached(_func))
+        getattr(module, target["function"])(**target["kwargs"])
+    finally:
+        for _name, _func in _originals.items():
+            setattr(module, _name, _func)
+        plt.close("all")
+    _missing = [_out for _out in target["outputs"] if not os.path.isfile(_out)]
+    if _missing:
+        raise RuntimeError(f"Outputs were not created: {_missing}")
+
+def main(targets=None, jobs=None, force=False, dry_run=False):
+    if targets:
+        targets = {_name: TARGETS[_name] for _name in targets}
+    else:
+        targets = TARGETS
+    stamps = load_stamps()
+    stale = stale_targets(targets, {} if force else stamps)
+    print("Up to date: {}".format(sorted(set(targets) - set(stale))))
+    print("Stale: {}".format(sorted(stale)))
+    if dry_run or not stale:
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(run_target, targets[_name]): _name
+                   for _name in stale}
+        for _future in as_completed(futures):
+            _name = futures[_future]
+            try:
+                _future.result()
+            except Exception as error:
+                print(f"Failed: {_name} ({error})")
+                continue
+            stamps[_name] = stale[_name]
+            save_stamps(stamps)
+            print(f"Finished: {_name}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("targets", nargs="*")
+    parser.add_argument("-j", dest="jobs", type=int, default=None)
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    params = vars(parser.parse_args())
+    main(**params)
@@ -0,0 +1,114 @@
+"""Tiled evaluation of the bounds on large parameter grids.
+
+This module contains functions to evaluate the closed-form expressions, e.g.,
+`lower_bound_no_csit`, on the full grid of parameters, which may be too large
+to fit into memory. The flattened grid is split into tiles, which are
+evaluated in parallel by a thread pool (NumPy releases the GIL for most array
+operations). The results are written into a memory-mapped `.npy` file.
+
+
+Copyright (C) 2020 Karl-Ludwig Besser
+
+This program is used in the article:
+Karl-Ludwig Besser and Eduard Jorswieck, "Bounds on the Secrecy Outage
+Probability for Dependent Fading Channels", IEEE Transactions on
+Communications, vol. 69, no. 1, pp. 443-456, Jan. 2021
+
+License:
+This program is licensed under the GPLv3 license. If you in any way use this
+code for research that results in publications, please cite our original
+article listed above.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+Author: Karl-Ludwig Besser, Technische Universität Braunschweig
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bounds_main_csit import (lower_bound_main_csit, upper_bound_main_csit,
+                              independent_main_csit)
+from bounds_no_csit import (lower_bound_no_csit, upper_bound_no_csit,
+                            independent_no_csit)
+from full_outage_main_csit import (lower_bound_main_csit_full,
+                                   upper_bound_main_csit_full,
+                                   independent_main_csit_full)
+from full_outage_no_csit import (lower_bound_no_csit_full,
+                                 upper_bound_no_csit_full,
+                                 independent_no_csit_full)
+
+FUNCTIONS = {_func.__name__: _func for _func in [
+    lower_bound_main_csit, upper_bound_main_csit, independent_main_csit,
+    lower_bound_no_csit, upper_bound_no_csit, independent_no_csit,
+    lower_bound_main_csit_full, upper_bound_main_csit_full,
+    independent_main_csit_full, lower_bound_no_csit_full,
+    upper_bound_no_csit_full, independent_no_csit_full]}
+
+def evaluate_grid(func, axes, filename, tile_size=2**16, workers=None,
+                  report_interval=1.):
+    """Evaluate `func` on the grid spanned by `axes` and store it in `filename`.
+
+    The dict `axes` maps the keyword arguments of `func` to 1-D arrays of
+    their values. The result is a memory-mapped array with shape
+    `(len(axis) for axis in axes.values())`, which is stored as `.npy` file.
+    Every tile of `tile_size` grid points is evaluated separately, such that
+    only the temporary arrays of the tiles currently processed are held in
+    memory. The progress and throughput are printed every
+    `report_interval` seconds.
+    """
+    names = list(axes)
+    values = [np.asarray(axes[_name]) for _name in names]
+    shape = tuple(len(_values) for _values in values)
+    results = np.lib.format.open_memmap(filename, mode="w+", dtype=float,
+                                        shape=shape)
+    results_flat = results.reshape(-1)
+    num_points = results_flat.size
+    num_tiles = int(np.ceil(num_points/tile_size))
+    def _evaluate_tile(tile):
+        _start = tile*tile_size
+        _stop = min(_start+tile_size, num_points)
+        _idx = np.unravel_index(np.arange(_start, _stop), shape)
+        _kwargs = {_name: _values[_i] for _name, _values, _i in zip(names, values, _idx)}
+        with np.errstate(all="ignore"):
+            results_flat[_start:_stop] = func(**_kwargs)
+        return _stop - _start
+    start_time = time.perf_counter()
+    last_report = start_time
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _num in executor.map(_evaluate_tile, range(num_tiles)):
+            done += _num
+            _now = time.perf_counter()
+            if _now - last_report >= report_interval or done == num_points:
+                last_report = _now
+                print("{}/{} points ({:.1%}), {:.3g} points/s".format(
+                    done, num_points, done/num_points, done/(_now-start_time)))
+    results.flush()
+    return results
+
+def main(function, num_points, filename=None, tile_size=2**16, workers=None):
+    axes = {"r_s": np.logspace(-3, 1, num_points),
+            "r_c": np.logspace(-3, 1, num_points),
+            "lam_x": np.logspace(-2, 2, num_points),
+            "lam_y": np.logspace(-2, 2, num_points)}
+    if filename is None:
+        filename = f"grid-{function}-n{num_points}.npy"
+    evaluate_grid(FUNCTIONS[function], axes, filename, tile_size=tile_size,
+                  workers=workers)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("function", choices=list(FUNCTIONS))
+    parser.add_argument("-n", dest="num_points", type=int, default=100)
+    parser.add_argument("-o", dest="filename", default=None)
+    parser.add_argument("--tile-size", type=int, default=2**16)
+    parser.add_argument("-j", dest="workers", type=int, default=None)
+    params = vars(parser.parse_args())
+    main(**params)